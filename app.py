@@ -1,12 +1,64 @@
 import streamlit as st
-import pickle
+import onnxruntime as ort
 import numpy as np
-import pandas as pd
-import altair as alt
+from features import AGE_MIN, AGE_MAX, derive_cached
+from batcher import PredictionBatcher
+
+# --- Load trained model (once per process, shared across reruns) ---
+@st.cache_resource
+def load_model():
+    # One intra-op thread: batches are tiny, and the default pool (one thread
+    # per core) would keep idle threads spinning next to Streamlit's
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    return ort.InferenceSession("model.onnx", options, providers=["CPUExecutionProvider"])
+
+# One batching worker per process, so concurrent sessions share model calls
+@st.cache_resource
+def load_batcher():
+    session = load_model()
+    return PredictionBatcher(lambda X: session.run(["probabilities"], {"X": X})[0][:, 1])
+
+# Inputs are discrete, so identical feature vectors recur often across reruns/users
+@st.cache_data(max_entries=1024)
+def predict_risk(features: tuple) -> float:
+    return load_batcher().predict(features)
+
+# Precomputed risk for every combination of the friendly answers (see train_model.py).
+# Memory-mapped read-only, so server processes share the same pages.
+@st.cache_resource
+def load_lut():
+    return np.load("lut.npy", mmap_mode="r")
+
+# Chart specs only depend on the (rounded) risk, so identical results reuse them.
+# altair is only needed once there is a result, so it is imported here.
+@st.cache_data
+def build_charts(risk_pct: float) -> tuple:
+    import altair as alt
+
+    donut_data = [
+        {"label": "Risk", "value": risk_pct},
+        {"label": "Safe", "value": max(0.0, 100 - risk_pct)},
+    ]
+    donut = alt.Chart(alt.Data(values=donut_data)).mark_arc(innerRadius=60).encode(
+        theta=alt.Theta("value:Q"),
+        color=alt.Color("label:N", scale=alt.Scale(range=["#e74c3c", "#2ecc71"]))
+    ).properties(width=250, height=250)
 
-# --- Load trained model ---
-with open("model.pkl", "rb") as f:
-    model = pickle.load(f)
+    # Bar chart with proper field names
+    bar_data = [{"risk_percentage": risk_pct, "category": "Risk"}]
+    bar = alt.Chart(alt.Data(values=bar_data)).mark_bar(color="#e67e22", size=30).encode(
+        x=alt.X("risk_percentage:Q", scale=alt.Scale(domain=[0, 100]), title="Risk Percentage (%)"),
+        y=alt.Y("category:N", axis=None)
+    ).properties(height=80, width=400)
+
+    # Threshold line
+    threshold_data = [{"threshold": 50}]
+    threshold = alt.Chart(alt.Data(values=threshold_data)).mark_rule(color="#888", strokeDash=[4,4], size=2).encode(
+        x=alt.X("threshold:Q", title="Risk Percentage (%)")
+    )
+
+    return donut.to_dict(), (bar + threshold).to_dict()
 
 # --- Title & Intro ---
 st.title("❤️ Heart Health Risk Checker")
@@ -14,149 +66,119 @@ st.write("Answer in simple terms (smoking, exercise, stress, etc.). We'll conver
 
 st.sidebar.header("📋 Your Input Summary")
 
+# --- Answer choices, indexed by score ---
+GENDER = ("Female", "Male")
+SMOKING = ("Never", "Occasionally", "Daily")
+EXERCISE = ("Rarely", "1-2 days/week", "3-5 days/week", "Everyday")
+DIET = ("Poor", "Average", "Healthy")
+STRESS = ("Low", "Moderate", "High")
+NO_YES = ("No", "Yes")
+WEIGHT = ("Underweight", "Normal", "Overweight", "Obese")
+SLEEP = ("Poor", "Average", "Good")
+UNKNOWN_NO_YES = ("Unknown", "No", "Yes")
+RESTECG = ("Unknown", "Normal", "ST-T wave abnormality", "Left ventricular hypertrophy")
+SLOPE = ("Unknown", "Upsloping", "Flat", "Downsloping")
+THAL = ("Unknown", "Normal", "Fixed defect", "Reversible defect")
+
 # --- Form: user-friendly questions ---
 with st.form("risk_form"):
-    age = st.slider("How old are you?", 18, 100, 45)
-    gender = st.radio("What is your gender?", ["Male", "Female"], horizontal=True)
+    age = st.slider("How old are you?", AGE_MIN, AGE_MAX, 45)
+    sex = st.radio("What is your gender?", [1, 0], format_func=GENDER.__getitem__, horizontal=True)
 
-    smoking = st.selectbox(
+    smoke_score = st.selectbox(
         "Do you smoke?",
-        ["Never", "Occasionally", "Daily"],
+        range(len(SMOKING)), format_func=SMOKING.__getitem__,
         help="Choose the option that best describes your smoking habit."
     )
-    exercise = st.selectbox(
+    exercise_score = st.selectbox(
         "How often do you exercise?",
-        ["Rarely", "1-2 days/week", "3-5 days/week", "Everyday"],
+        range(len(EXERCISE)), format_func=EXERCISE.__getitem__,
         help="Any activity that raises your heart rate counts."
     )
-    diet = st.selectbox(
+    diet_score = st.selectbox(
         "How healthy is your diet?",
-        ["Poor", "Average", "Healthy"],
+        range(len(DIET)), format_func=DIET.__getitem__,
         help="Overall balance of fruits/vegetables vs fried/processed foods."
     )
-    stress = st.selectbox(
+    stress_score = st.selectbox(
         "Your stress level",
-        ["Low", "Moderate", "High"],
+        range(len(STRESS)), format_func=STRESS.__getitem__,
         help="How stressed do you feel most days?"
     )
-    family_history = st.radio(
-        "Family history of heart problems?", ["No", "Yes"], horizontal=True,
+    family_score = st.radio(
+        "Family history of heart problems?", range(len(NO_YES)), format_func=NO_YES.__getitem__, horizontal=True,
     )
-    weight = st.selectbox(
+    weight_score = st.selectbox(
         "Your weight category",
-        ["Underweight", "Normal", "Overweight", "Obese"],
+        range(len(WEIGHT)), format_func=WEIGHT.__getitem__,
         help="If unsure, choose what fits best."
     )
-    sleep = st.selectbox(
+    sleep_score = st.selectbox(
         "Your sleep quality",
-        ["Poor", "Average", "Good"],
+        range(len(SLEEP)), format_func=SLEEP.__getitem__,
     )
 
     # Optional: enter medical values directly if you have them
     with st.expander("I have my medical test values (optional)"):
         trestbps_opt = st.number_input("Resting blood pressure (mmHg)", min_value=0, max_value=300, value=0)
         chol_opt = st.number_input("Cholesterol (mg/dL)", min_value=0, max_value=800, value=0)
-        fbs_opt = st.selectbox("Fasting blood sugar > 120 mg/dL?", ["Unknown", "No", "Yes"], index=0)
-        restecg_opt = st.selectbox("Resting ECG", ["Unknown", "Normal", "ST-T wave abnormality", "Left ventricular hypertrophy"], index=0)
+        fbs_opt = st.selectbox("Fasting blood sugar > 120 mg/dL?", range(len(UNKNOWN_NO_YES)), format_func=UNKNOWN_NO_YES.__getitem__, index=0)
+        restecg_opt = st.selectbox("Resting ECG", range(len(RESTECG)), format_func=RESTECG.__getitem__, index=0)
         thalach_opt = st.number_input("Max heart rate (bpm)", min_value=0, max_value=230, value=0)
-        exang_opt = st.selectbox("Chest pain during exercise?", ["Unknown", "No", "Yes"], index=0)
+        exang_opt = st.selectbox("Chest pain during exercise?", range(len(UNKNOWN_NO_YES)), format_func=UNKNOWN_NO_YES.__getitem__, index=0)
         oldpeak_opt = st.number_input("ST depression (oldpeak)", min_value=0.0, max_value=10.0, value=0.0, step=0.1)
-        slope_opt = st.selectbox("Slope at peak exercise", ["Unknown", "Upsloping", "Flat", "Downsloping"], index=0)
+        slope_opt = st.selectbox("Slope at peak exercise", range(len(SLOPE)), format_func=SLOPE.__getitem__, index=0)
         ca_opt = st.slider("Major vessels colored by flourosopy (0-4)", 0, 4, 0)
-        thal_opt = st.selectbox("Thal", ["Unknown", "Normal", "Fixed defect", "Reversible defect"], index=0)
+        thal_opt = st.selectbox("Thal", range(len(THAL)), format_func=THAL.__getitem__, index=0)
 
     submitted = st.form_submit_button("Check risk")
 
 # --- Convert friendly inputs to model features ---
-sex = 1 if gender == "Male" else 0
-
-smoke_score = {"Never": 0, "Occasionally": 1, "Daily": 2}[smoking]
-exercise_score = {"Rarely": 0, "1-2 days/week": 1, "3-5 days/week": 2, "Everyday": 3}[exercise]
-diet_score = {"Poor": 0, "Average": 1, "Healthy": 2}[diet]
-stress_score = {"Low": 0, "Moderate": 1, "High": 2}[stress]
-family_score = 1 if family_history == "Yes" else 0
-weight_score = {"Underweight": 0, "Normal": 1, "Overweight": 2, "Obese": 3}[weight]
-sleep_score = {"Poor": 0, "Average": 1, "Good": 2}[sleep]
-
-# Default estimates (used if optional values not provided)
-def estimate_trestbps():
-    base = 110 + (age - 18) * 0.2
-    return int(base + stress_score * 8 + weight_score * 7)
-
-def estimate_chol():
-    base = 160 + (age - 18) * 0.8
-    smoke_penalty = [0, 15, 30][smoke_score]
-    diet_adjust = [25, 10, -10][diet_score]
-    return int(base + smoke_penalty + diet_adjust)
-
-def estimate_thalach():
-    base = 200 - age
-    exercise_bonus = [ -10, -5, 0, 5 ][exercise_score]
-    return int(max(90, min(200, base + exercise_bonus - stress_score * 5)))
-
-def estimate_oldpeak():
-    return round(0.2 + stress_score * 0.6 + max(0, weight_score - 1) * 0.3, 1)
-
-def derive_cp():
-    if stress_score == 2 and exercise_score == 0:
-        return 2
-    if stress_score == 2 and smoke_score == 2:
-        return 1
-    return 0
-
-def derive_fbs():
-    if diet_score == 0 and weight_score == 3:
-        return 1
-    if age >= 60 and diet_score == 0:
-        return 1
-    return 0
-
-def derive_restecg():
-    return 0
-
-def derive_exang():
-    return 1 if (exercise_score == 0 and stress_score >= 1) else 0
-
-def derive_slope():
-    if exercise_score >= 2 and stress_score == 0:
-        return 0  # upsloping
-    if stress_score == 2:
-        return 2  # downsloping
-    return 1  # flat
-
-def derive_ca():
-    return 1 if (age >= 60 and smoke_score == 2) else 0
-
-def derive_thal():
-    return 2 if family_score == 1 else 1
-
-# Use optional medical inputs when provided (non-zero / non-Unknown)
-trestbps = int(trestbps_opt) if 'trestbps_opt' in locals() and trestbps_opt > 0 else estimate_trestbps()
-chol = int(chol_opt) if 'chol_opt' in locals() and chol_opt > 0 else estimate_chol()
-fbs = {"Unknown": derive_fbs(), "No": 0, "Yes": 1}[fbs_opt] if 'fbs_opt' in locals() else derive_fbs()
-restecg = {"Unknown": derive_restecg(), "Normal": 0, "ST-T wave abnormality": 1, "Left ventricular hypertrophy": 2}[restecg_opt] if 'restecg_opt' in locals() else derive_restecg()
-thalach = int(thalach_opt) if 'thalach_opt' in locals() and thalach_opt > 0 else estimate_thalach()
-exang = {"Unknown": derive_exang(), "No": 0, "Yes": 1}[exang_opt] if 'exang_opt' in locals() else derive_exang()
-oldpeak = float(oldpeak_opt) if 'oldpeak_opt' in locals() and oldpeak_opt > 0 else estimate_oldpeak()
-slope = {"Unknown": derive_slope(), "Upsloping": 0, "Flat": 1, "Downsloping": 2}[slope_opt] if 'slope_opt' in locals() else derive_slope()
-ca = int(ca_opt) if 'ca_opt' in locals() else derive_ca()
-thal = {"Unknown": derive_thal(), "Normal": 1, "Fixed defect": 2, "Reversible defect": 3}[thal_opt] if 'thal_opt' in locals() else derive_thal()
-cp = derive_cp()
+# (the widgets above return option indices, which are already the scores)
+
+# Default estimates for every feature, from the friendly answers
+(
+    _, _, cp, trestbps_est, chol_est, fbs_est, restecg_est, thalach_est,
+    exang_est, oldpeak_est, slope_est, ca_est, thal_est,
+) = derive_cached(age, sex, smoke_score, exercise_score, diet_score, stress_score, family_score, weight_score)
+
+# Use optional medical inputs when provided (non-zero / non-Unknown).
+# Index 0 of the select boxes is "Unknown"; the others are feature value + 1,
+# except thal, whose codes start at 1.
+trestbps = int(trestbps_opt) if 'trestbps_opt' in locals() and trestbps_opt > 0 else int(trestbps_est)
+chol = int(chol_opt) if 'chol_opt' in locals() and chol_opt > 0 else int(chol_est)
+fbs = fbs_opt - 1 if fbs_opt else int(fbs_est)
+restecg = restecg_opt - 1 if restecg_opt else int(restecg_est)
+thalach = int(thalach_opt) if 'thalach_opt' in locals() and thalach_opt > 0 else int(thalach_est)
+exang = exang_opt - 1 if exang_opt else int(exang_est)
+oldpeak = float(oldpeak_opt) if 'oldpeak_opt' in locals() and oldpeak_opt > 0 else oldpeak_est
+slope = slope_opt - 1 if slope_opt else int(slope_est)
+ca = int(ca_opt) if 'ca_opt' in locals() else int(ca_est)
+thal = thal_opt if thal_opt else int(thal_est)
+cp = int(cp)
+
+# With no medical values entered the prediction only depends on the friendly answers
+no_medical_values = (
+    trestbps_opt == 0 and chol_opt == 0 and thalach_opt == 0 and oldpeak_opt == 0 and ca_opt == 0
+    and fbs_opt == restecg_opt == exang_opt == slope_opt == thal_opt == 0
+)
 
 # Sidebar summary in plain language
-st.sidebar.markdown(f"**Age:** {age}")
-st.sidebar.markdown(f"**Gender:** {gender}")
-st.sidebar.markdown(f"**Smoking:** {smoking}")
-st.sidebar.markdown(f"**Exercise:** {exercise}")
-st.sidebar.markdown(f"**Diet:** {diet}")
-st.sidebar.markdown(f"**Stress:** {stress}")
-st.sidebar.markdown(f"**Family history:** {family_history}")
-st.sidebar.markdown(f"**Weight:** {weight}")
-st.sidebar.markdown(f"**Sleep:** {sleep}")
+st.sidebar.markdown(
+    f"**Age:** {age}\n\n"
+    f"**Gender:** {GENDER[sex]}\n\n"
+    f"**Smoking:** {SMOKING[smoke_score]}\n\n"
+    f"**Exercise:** {EXERCISE[exercise_score]}\n\n"
+    f"**Diet:** {DIET[diet_score]}\n\n"
+    f"**Stress:** {STRESS[stress_score]}\n\n"
+    f"**Family history:** {NO_YES[family_score]}\n\n"
+    f"**Weight:** {WEIGHT[weight_score]}\n\n"
+    f"**Sleep:** {SLEEP[sleep_score]}"
+)
 
 # Only run prediction when the button is clicked
 if 'submitted' in locals() and submitted:
-    X = np.array([[
+    features = (
         age,        # age
         sex,        # sex
         cp,         # cp
@@ -170,9 +192,13 @@ if 'submitted' in locals() and submitted:
         slope,      # slope
         ca,         # ca
         thal        # thal
-    ]])
+    )
 
-    pred_prob = float(model.predict_proba(X)[0][1])
+    if no_medical_values:
+        idx = (age - AGE_MIN, sex, smoke_score, exercise_score, diet_score, stress_score, family_score, weight_score)
+        pred_prob = float(load_lut()[idx])
+    else:
+        pred_prob = predict_risk(features)
     pred_label = "High Risk 💔" if pred_prob > 0.5 else "Low Risk ❤️"
     risk_pct = round(pred_prob * 100, 1)
 
@@ -181,33 +207,13 @@ if 'submitted' in locals() and submitted:
     st.progress(pred_prob)
 
     # Charts: donut and bar
-    donut_df = pd.DataFrame({
-        "label": ["Risk", "Safe"],
-        "value": [risk_pct, max(0.0, 100 - risk_pct)]
-    })
-    donut = alt.Chart(donut_df).mark_arc(innerRadius=60).encode(
-        theta=alt.Theta("value:Q"),
-        color=alt.Color("label:N", scale=alt.Scale(range=["#e74c3c", "#2ecc71"]))
-    ).properties(width=250, height=250)
-
-    # Bar chart with proper field names
-    bar_df = pd.DataFrame({"risk_percentage": [risk_pct], "category": ["Risk"]})
-    bar = alt.Chart(bar_df).mark_bar(color="#e67e22", size=30).encode(
-        x=alt.X("risk_percentage:Q", scale=alt.Scale(domain=[0, 100]), title="Risk Percentage (%)"),
-        y=alt.Y("category:N", axis=None)
-    ).properties(height=80, width=400)
-    
-    # Threshold line
-    threshold_df = pd.DataFrame({"threshold": [50]})
-    threshold = alt.Chart(threshold_df).mark_rule(color="#888", strokeDash=[4,4], size=2).encode(
-        x=alt.X("threshold:Q", title="Risk Percentage (%)")
-    )
+    donut_spec, bar_spec = build_charts(risk_pct)
 
     cols = st.columns(2)
     with cols[0]:
-        st.altair_chart(donut, use_container_width=False)
+        st.vega_lite_chart(donut_spec, use_container_width=False)
     with cols[1]:
-        st.altair_chart(bar + threshold, use_container_width=True)
+        st.vega_lite_chart(bar_spec, use_container_width=True)
 
     st.write("### 💡 Health Advice")
     if pred_label == "Low Risk ❤️":
@@ -0,0 +1,60 @@
+# Micro-batching for model calls: concurrent sessions each submit one feature
+# row, and a single worker thread scores whatever has queued up in one call.
+import queue
+import threading
+
+import numpy as np
+
+
+class PredictionBatcher:
+    def __init__(self, predict, n_features=13, max_batch=32):
+        # predict: (N, n_features) float32 array -> N probabilities
+        self._predict = predict
+        self._max_batch = max_batch
+        # Input rows are copied into this buffer instead of a new array per
+        # batch; only the worker thread touches it
+        self._X = np.empty((max_batch, n_features), dtype=np.float32)
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="prediction-batcher", daemon=True).start()
+
+    def submit(self, features):
+        # Returns an Event that is set once slot[0] holds the result
+        evt, slot = threading.Event(), [None]
+        self._queue.put((features, evt, slot))
+        return evt, slot
+
+    def predict(self, features, timeout=10.0):
+        evt, slot = self.submit(features)
+        if not evt.wait(timeout):
+            raise TimeoutError(f"no prediction within {timeout} s")
+        if isinstance(slot[0], BaseException):
+            raise slot[0]
+        return slot[0]
+
+    def _run(self):
+        while True:
+            # Block for the first request, then take only rows that are already
+            # waiting (they queued up while the previous batch was scored), so a
+            # lone request is scored immediately
+            batch = [self._queue.get()]
+            # Any failure is handed to the waiting callers; the worker keeps running
+            try:
+                while len(batch) < self._max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                results = self._score(batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, evt, slot), result in zip(batch, results):
+                slot[0] = result
+                evt.set()
+
+    def _score(self, batch):
+        for i, (features, _, _) in enumerate(batch):
+            self._X[i] = features
+        results = [float(p) for p in self._predict(self._X[:len(batch)])]
+        if len(results) != len(batch):
+            raise ValueError(f"model returned {len(results)} results for {len(batch)} rows")
+        return results
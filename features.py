@@ -0,0 +1,70 @@
+# Convert the app's plain-language answers into the 13 model features.
+# Shared by app.py (single prediction) and train_model.py (lookup table).
+from functools import lru_cache
+
+import numpy as np
+from numba import njit
+
+AGE_MIN, AGE_MAX = 18, 100
+
+# Number of choices per friendly answer, in lookup-table axis order:
+# age, sex, smoking, exercise, diet, stress, family history, weight.
+# Sleep quality is shown to the user but not used by any estimate.
+LUT_SHAPE = (AGE_MAX - AGE_MIN + 1, 2, 3, 4, 3, 3, 2, 4)
+
+# Score -> adjustment tables, indexed by the answer's score
+CHOL_SMOKE_PENALTY = np.array([0, 15, 30])
+CHOL_DIET_ADJUST = np.array([25, 10, -10])
+THALACH_EXERCISE_BONUS = np.array([-10, -5, 0, 5])
+
+# Default estimates for all 13 features (used if optional values not provided),
+# returned as a tuple of floats in model column order. Compiled with numba and
+# cached on disk, so a single prediction costs one native call.
+@njit(cache=True)
+def derive(age, sex, smoke_score, exercise_score, diet_score, stress_score, family_score, weight_score):
+    if stress_score == 2 and exercise_score == 0:
+        cp = 2
+    elif stress_score == 2 and smoke_score == 2:
+        cp = 1
+    else:
+        cp = 0
+
+    trestbps = int(110 + (age - 18) * 0.2 + stress_score * 8 + weight_score * 7)
+    chol = int(160 + (age - 18) * 0.8 + CHOL_SMOKE_PENALTY[smoke_score] + CHOL_DIET_ADJUST[diet_score])
+    fbs = 1 if diet_score == 0 and (weight_score == 3 or age >= 60) else 0
+    restecg = 0
+    thalach = max(90, min(200, 200 - age + THALACH_EXERCISE_BONUS[exercise_score] - stress_score * 5))
+    exang = 1 if (exercise_score == 0 and stress_score >= 1) else 0
+    oldpeak = round(0.2 + stress_score * 0.6 + max(0, weight_score - 1) * 0.3, 1)
+
+    if exercise_score >= 2 and stress_score == 0:
+        slope = 0  # upsloping
+    elif stress_score == 2:
+        slope = 2  # downsloping
+    else:
+        slope = 1  # flat
+
+    ca = 1 if (age >= 60 and smoke_score == 2) else 0
+    thal = 2 if family_score == 1 else 1
+
+    return (
+        float(age), float(sex), float(cp), float(trestbps), float(chol), float(fbs), float(restecg),
+        float(thalach), float(exang), oldpeak, float(slope), float(ca), float(thal),
+    )
+
+# Memoized derive() for the app. Answers are small integers and most reruns
+# repeat an earlier combination, so a hit skips the call into compiled code.
+derive_cached = lru_cache(maxsize=256)(derive)
+
+# Same estimates for 1-D arrays of scores, as an (N, 13) float32 matrix
+@njit(cache=True)
+def derive_features(age, sex, smoke_score, exercise_score, diet_score, stress_score, family_score, weight_score):
+    X = np.empty((len(age), 13), dtype=np.float32)
+    for i in range(len(age)):
+        row = derive(
+            age[i], sex[i], smoke_score[i], exercise_score[i],
+            diet_score[i], stress_score[i], family_score[i], weight_score[i],
+        )
+        for j in range(13):
+            X[i, j] = row[j]
+    return X
@@ -1,22 +1,49 @@
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-import pickle
+from sklearn.ensemble import HistGradientBoostingClassifier
+import joblib
+import onnxruntime as ort
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+from features import LUT_SHAPE, AGE_MIN, derive_features
 
 # Load your dataset
 df = pd.read_csv("heart (1).csv")
 
-# Features and target
-X = df.drop("target", axis=1)
+# Features and target (float32, the dtype the app scores with)
+X = df.drop("target", axis=1).astype(np.float32)
 y = df["target"]
 
 # Split and train
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-model = RandomForestClassifier(n_estimators=200, random_state=42)
+model = HistGradientBoostingClassifier(max_iter=50, max_depth=6, min_samples_leaf=5, random_state=42)
 model.fit(X_train, y_train)
 
-# Save the model
-with open("model.pkl", "wb") as f:
-    pickle.dump(model, f)
+# Save the model (LZ4-compressed; load with joblib.load)
+joblib.dump(model, "model.pkl", compress=("lz4", 3))
+
+# Export to ONNX for the app (probabilities as a plain tensor, no ZipMap)
+onx = convert_sklearn(
+    model,
+    initial_types=[("X", FloatTensorType([None, 13]))],
+    options={id(model): {"zipmap": False}},
+)
+with open("model.onnx", "wb") as f:
+    f.write(onx.SerializeToString())
+
+# Precompute the risk for every combination of friendly answers so the app
+# can look it up instead of running the model (index order: see LUT_SHAPE)
+grid = np.indices(LUT_SHAPE).reshape(len(LUT_SHAPE), -1)
+grid[0] += AGE_MIN
+X_lut = derive_features(*grid)
+# The "major vessels" slider defaults to 0 and the app always takes it as given
+X_lut[:, 11] = 0
+# Scored with the exported ONNX model, so the table agrees with the app's model path
+# (its float32 thresholds can differ from sklearn's on split boundaries)
+sess = ort.InferenceSession(onx.SerializeToString(), providers=["CPUExecutionProvider"])
+probs = sess.run(["probabilities"], {"X": X_lut})[0][:, 1].reshape(LUT_SHAPE)
+# Saved uncompressed so the app can memory-map it
+np.save("lut.npy", probs.astype(np.float16))
 
 print("✅ Model trained and saved successfully!")